@@ -11,32 +11,65 @@ Uso:
     python sociallunch_bot.py
     python sociallunch_bot.py --visible    # Ver navegador
     python sociallunch_bot.py --dry-run    # Simular sin pedir
+    python sociallunch_bot.py --debug      # Mostrar detalle de cada día
 """
 
 import argparse
+import asyncio
+import logging
 import os
 import random
 import sys
-import time
 from datetime import datetime
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+
+
+logger = logging.getLogger("sociallunch")
 
 
 # =============================================================================
 # CONFIGURACIÓN
 # =============================================================================
 
+# Recursos que no se descargan: el bot solo necesita el HTML y el JS de la app
+RECURSOS_BLOQUEADOS = ("image", "media", "font")
+DOMINIOS_BLOQUEADOS = ("google-analytics", "googletagmanager", "gtag")
+
+# Selectores fijos de la app, armados una sola vez
+SELECTOR_LOGIN_USUARIO = 'input[type="email"], input[type="text"]'
+SELECTOR_LOGIN_SUBMIT = 'input[type="submit"], button[type="submit"]'
+SELECTOR_DIAS = 'div[id^="date_"]'
+SELECTOR_DIAS_PENDIENTES = (
+    f"{SELECTOR_DIAS}.futuro:not(.sin-servicio):not(.con-pedido):not(.pasado)"
+)
+SELECTOR_ITEMS = "input.selection_items"
+SELECTOR_SIN_SERVICIO = ':text-is("DÍA SIN SERVICIO")'
+# Los inputs pueden estar ocultos detrás de su label: la visibilidad se mide en el label
+JS_ITEMS_VISIBLES = """const itemsVisibles = (selector) =>
+    Array.from(document.querySelectorAll(selector)).filter(item =>
+        (item.closest('label') || item).getClientRects().length > 0);"""
+# Una pestaña de categoría abierta se marca con una clase o con aria-selected
+JS_CATEGORIA_ACTIVA = """el => el.getAttribute('aria-selected') === 'true'
+    || /\\b(active|activ[oa]|selected|seleccionad[oa]|current)\\b/i.test(el.className)"""
+SELECTORES_CATEGORIA = {
+    categoria: f'div[data-dimension="{categoria}"]'
+    for categoria in ("ENSALADAS", "POSTRES", "BEBIDAS")
+}
+
+
+class ConfigError(Exception):
+    """La configuración del agente está incompleta."""
+
+
 def get_config():
     """Obtiene configuración desde variables de entorno."""
     usuario = os.environ.get("SOCIALLUNCH_USER")
     password = os.environ.get("SOCIALLUNCH_PASS")
     
     if not usuario or not password:
-        print("❌ Error: Variables de entorno no configuradas")
-        print("   Configurar SOCIALLUNCH_USER y SOCIALLUNCH_PASS")
-        sys.exit(1)
+        raise ConfigError("Configurar SOCIALLUNCH_USER y SOCIALLUNCH_PASS")
     
-    return {
+    config = {
         "url": "https://app.sociallunch.com.ar/",
         "usuario": usuario,
         "password": password,
@@ -59,389 +92,580 @@ def get_config():
             "pepsi zero"
         ],
         
+        # Sesión guardada para evitar el login en cada ejecución
+        "archivo_sesion": ".auth.json",
+        
+        # Cantidad de días que se procesan en paralelo (un contexto por trabajador)
+        "dias_en_paralelo": 4,
+        
         # Timeouts
         "timeout_navegacion": 30000,
-        "timeout_elemento": 10000,
-        "delay_entre_acciones": 1500,
+        "timeout_calendario": 15000,
+        "timeout_menu": 10000,
+        "timeout_modal": 5000,
+        "timeout_sesion": 5000,
+        "timeout_elemento": 3000,
     }
+    
+    # Normalizar una sola vez para no repetir .lower() en cada comparación
+    for clave in ("ensaladas_keywords", "postres_preferidos", "bebidas_preferidas"):
+        config[clave] = [keyword.lower() for keyword in config[clave]]
+    
+    return config
+
+
+# =============================================================================
+# UTILIDADES
+# =============================================================================
+
+class LoggerDia(logging.LoggerAdapter):
+    """Antepone el número de día a cada mensaje: los días se procesan en paralelo."""
+    
+    def process(self, msg, kwargs):
+        return f"   [día {self.extra['numero']}] {msg.strip()}", kwargs
+
+
+def registrar_respuesta_json(response):
+    """
+    Muestra en modo debug las respuestas JSON que recibe la app.
+    Sirve para ubicar el endpoint del calendario y evaluar consultarlo sin navegador.
+    """
+    if "json" in response.headers.get("content-type", ""):
+        logger.debug("   API: %s %s -> %s", response.request.method, response.url, response.status)
 
 
 # =============================================================================
 # FUNCIONES PRINCIPALES
 # =============================================================================
 
-def login(page, config):
+async def login(page, config):
     """Realiza el login en Social Lunch."""
-    print("🔐 Iniciando sesión...")
+    logger.info("🔐 Iniciando sesión...")
     
-    page.goto(config["url"], timeout=config["timeout_navegacion"])
-    page.wait_for_load_state("networkidle")
-    time.sleep(2)
+    await page.goto(config["url"])
+    await page.wait_for_selector('input[type="password"]')
     
-    # Completar login
-    page.fill('input[type="text"]', config["usuario"])
-    page.fill('input[type="password"]', config["password"])
+    # Completar login (las listas CSS se resuelven en el navegador en una sola llamada)
+    await page.locator(SELECTOR_LOGIN_USUARIO).first.fill(config["usuario"])
+    await page.fill('input[type="password"]', config["password"])
     
     # Submit
-    page.click('input[type="submit"]')
+    await page.locator(SELECTOR_LOGIN_SUBMIT).first.click()
     
-    page.wait_for_load_state("networkidle")
-    time.sleep(5)  # Espera más larga para que cargue todo
+    # Verificar login esperando el saludo en lugar de una pausa fija
+    try:
+        await page.wait_for_selector("text=HOLA", timeout=config["timeout_navegacion"])
+        logger.info("✅ Login exitoso")
+        return True
+    except PlaywrightTimeout:
+        logger.error("❌ Error en login")
+        return False
+
+
+async def sesion_activa(page, config):
+    """Verifica si la sesión guardada sigue siendo válida."""
+    logger.info("🔐 Verificando sesión guardada...")
     
-    # Verificar login
-    if page.locator("text=HOLA").count() > 0:
-        print("✅ Login exitoso")
+    try:
+        await page.goto(config["url"])
+        await page.wait_for_selector("text=HOLA", timeout=config["timeout_sesion"])
+        logger.info("✅ Sesión reutilizada")
         return True
-    else:
-        print("❌ Error en login")
+    except PlaywrightTimeout:
+        logger.info("   ⏭️ Sesión expirada, iniciando sesión de nuevo...")
         return False
 
 
-def obtener_dias_disponibles(page):
+async def obtener_dias_disponibles(page, config):
     """
     Obtiene días disponibles para pedir.
     
     Estructura del HTML:
     - div con id="date_2026-02-XX" 
     - class contiene "date" y "futuro"
-    - NO contiene "sin-servicio" ni "con-pedido"
+    - NO contiene "sin-servicio", "con-pedido" ni "pasado"
+    
+    Devuelve None si el calendario no terminó de renderizarse, para no
+    confundirlo con un mes sin días pendientes.
     """
-    print("\n📅 Buscando días disponibles...")
+    logger.info("\n📅 Buscando días disponibles...")
     
     # Esperar explícitamente a que el calendario cargue
-    print("   Esperando que cargue el calendario...")
+    logger.info("   Esperando que cargue el calendario...")
     try:
-        page.wait_for_selector('div[id^="date_"]', timeout=15000)
-        print("   ✅ Calendario detectado")
+        await page.wait_for_selector(SELECTOR_DIAS, timeout=config["timeout_calendario"])
+        logger.info("   ✅ Calendario detectado")
     except:
-        print("   ❌ No se detectó el calendario")
+        logger.error("   ❌ No se detectó el calendario")
         return []
     
-    # Espera adicional para que terminen de cargar todos los días
-    time.sleep(3)
+    # Esperar a que TODOS los días terminen de renderizarse (tienen número):
+    # los días se dibujan de a poco y uno sin número todavía se perdería
+    try:
+        await page.wait_for_function(
+            """(selector) => Array.from(document.querySelectorAll(selector))
+                .every(el => el.querySelector('.dia_numero'))""",
+            arg=SELECTOR_DIAS,
+            timeout=config["timeout_calendario"]
+        )
+    except PlaywrightTimeout:
+        logger.error("   ❌ Los días del calendario no terminaron de cargar")
+        return None
     
-    # Buscar todos los divs que tienen ID que empieza con "date_"
-    todos_los_dias = page.locator('div[id^="date_"]').all()
+    # El navegador filtra los días pendientes con un solo selector CSS:
+    # "futuro" y NO "sin-servicio", "con-pedido" ni "pasado"
+    dias_disponibles = await page.eval_on_selector_all(
+        SELECTOR_DIAS_PENDIENTES,
+        """els => els.map(el => ({
+            id: el.id,
+            numero: el.querySelector('.dia_numero').innerText.trim()
+        }))"""
+    )
     
-    print(f"   Total de días en calendario: {len(todos_los_dias)}")
+    # Debug: mostrar la clase de todos los días para ver por qué se excluyó cada uno
+    if logger.isEnabledFor(logging.DEBUG):
+        todos_los_dias = await page.eval_on_selector_all(
+            SELECTOR_DIAS, "els => els.map(el => [el.id, el.className])"
+        )
+        for dia_id, clase in todos_los_dias:
+            logger.debug("   DEBUG: %s -> clase: '%s'", dia_id, clase)
     
-    dias_disponibles = []
-    for elem in todos_los_dias:
-        try:
-            clase = elem.get_attribute("class") or ""
-            dia_id = elem.get_attribute("id") or ""
-            
-            # Debug: mostrar qué encontró
-            print(f"   DEBUG: {dia_id} -> clase: '{clase}'")
-            
-            # Verificar condiciones:
-            # 1. Tiene "futuro" en la clase
-            # 2. NO tiene "sin-servicio"
-            # 3. NO tiene "con-pedido"
-            # 4. NO tiene "pasado"
-            es_futuro = "futuro" in clase
-            sin_servicio = "sin-servicio" in clase
-            con_pedido = "con-pedido" in clase
-            es_pasado = "pasado" in clase
-            
-            if es_futuro and not sin_servicio and not con_pedido and not es_pasado:
-                # Obtener el número del día
-                numero_elem = elem.locator(".dia_numero")
-                if numero_elem.count() > 0:
-                    numero = numero_elem.inner_text().strip()
-                    
-                    dias_disponibles.append({
-                        "elemento": elem,
-                        "id": dia_id,
-                        "numero": numero
-                    })
-                    print(f"   ✅ Día {numero} disponible para pedir")
-        except Exception as e:
-            print(f"   Error procesando día: {e}")
-            continue
+    for dia in dias_disponibles:
+        logger.info(f"   ✅ Día {dia['numero']} disponible para pedir")
     
-    print(f"\n   📊 Resumen: {len(dias_disponibles)} días para pedir")
+    logger.info(f"\n   📊 Resumen: {len(dias_disponibles)} días para pedir")
     return dias_disponibles
 
 
-def seleccionar_ubicacion(page, config):
+async def seleccionar_ubicacion(page, config, log=logger):
     """Selecciona COHEN PISO 1 en el modal."""
-    print("   📍 Seleccionando ubicación...")
+    log.info("   📍 Seleccionando ubicación...")
     
     try:
         # Esperar a que aparezca el modal
-        page.wait_for_selector(f'text="{config["ubicacion"]}"', timeout=5000)
-        page.click(f'text="{config["ubicacion"]}"')
-        time.sleep(config["delay_entre_acciones"] / 1000)
-        print("   ✅ Ubicación seleccionada")
+        await page.wait_for_selector(f'text="{config["ubicacion"]}"', timeout=config["timeout_modal"])
+        await page.click(f'text="{config["ubicacion"]}"')
+        log.info("   ✅ Ubicación seleccionada")
         return True
     except PlaywrightTimeout:
         # Puede que no aparezca el modal si ya está seleccionada
-        print("   ⏭️ Modal de ubicación no apareció, continuando...")
+        log.info("   ⏭️ Modal de ubicación no apareció, continuando...")
         return True
     except Exception as e:
-        print(f"   ⚠️ Error en ubicación: {e}")
+        log.warning(f"   ⚠️ Error en ubicación: {e}")
         return True
 
 
-def seleccionar_item_de_categoria(page, config, categoria, keywords, descripcion):
+async def seleccionar_item_de_categoria(page, config, categoria, keywords, descripcion,
+                                       vistos, log=logger):
     """
     Va a una categoría y selecciona un item que coincida con los keywords.
     La selección se hace mediante checkboxes dentro de labels.
+    `vistos` acumula las descripciones de las categorías ya procesadas en el día,
+    para no confundir sus items con los de esta categoría.
     """
-    print(f"   🍽️ Seleccionando {descripcion}...")
+    log.info(f"   🍽️ Seleccionando {descripcion}...")
     
     try:
-        # Click en la categoría usando el atributo data-dimension
-        page.click(f'div[data-dimension="{categoria}"]', timeout=5000)
-        time.sleep(config["delay_entre_acciones"] / 1000)
-        page.wait_for_load_state("networkidle")
-        time.sleep(1)
+        selector_categoria = SELECTORES_CATEGORIA[categoria]
         
-        # Los items son inputs con clase "selection_items" y tienen data-desc con la descripción
-        # Pero necesitamos hacer click en el LABEL padre para que funcione el onclick
-        items = page.locator('input.selection_items').all()
+        # Primer item visible antes de cambiar de categoría, para detectar el cambio
+        desc_previa = await page.evaluate(
+            f"(selector) => {{ {JS_ITEMS_VISIBLES} "
+            "const item = itemsVisibles(selector)[0]; "
+            "return item ? item.getAttribute('data-desc') : null; }",
+            SELECTOR_ITEMS
+        )
         
-        if not items:
-            print(f"   ⚠️ No hay items en {categoria}")
-            return False
+        if await page.eval_on_selector(selector_categoria, JS_CATEGORIA_ACTIVA):
+            # La categoría ya está abierta (por ej. la pestaña por defecto del menú)
+            condicion = f"([selector]) => {{ {JS_ITEMS_VISIBLES} return itemsVisibles(selector).length > 0; }}"
+        else:
+            # Click en la categoría usando el atributo data-dimension
+            await page.click(selector_categoria)
+            
+            # Esperar a que se muestren los items de ESTA categoría: el primer item
+            # visible tiene que ser distinto al que se veía antes y a los ya usados
+            condicion = (
+                f"([selector, previa, vistos]) => {{ {JS_ITEMS_VISIBLES} "
+                "const item = itemsVisibles(selector)[0]; "
+                "if (!item) return false; "
+                "const desc = item.getAttribute('data-desc'); "
+                "return desc !== previa && !vistos.includes(desc); }"
+            )
         
-        print(f"   📋 Encontrados {len(items)} items en {categoria}")
+        try:
+            await page.wait_for_function(
+                condicion,
+                arg=[SELECTOR_ITEMS, desc_previa, vistos],
+                timeout=config["timeout_menu"]
+            )
+        except PlaywrightTimeout:
+            if desc_previa is None or desc_previa in vistos:
+                log.warning(f"   ⚠️ Los items de {categoria} no cargaron")
+                return False
+            # Los items visibles no son de una categoría ya usada: la categoría
+            # ya estaba abierta aunque la pestaña no lo indique
+            log.info(f"   ⏭️ {categoria} ya estaba abierta")
         
-        # Buscar items que coincidan con los keywords
-        items_coincidentes = []
+        # Los items son inputs con clase "selection_items" y tienen data-desc con la descripción.
+        # La comparación con los keywords se hace en el navegador en un solo roundtrip.
+        # Solo se consideran los items visibles (los de la categoría abierta).
+        resultado = await page.evaluate(f"""([selector, keywords]) => {{
+            {JS_ITEMS_VISIBLES}
+            const todos = Array.from(document.querySelectorAll(selector));
+            const items = itemsVisibles(selector);
+            const coincidentes = [];
+            items.forEach(item => {{
+                const indice = todos.indexOf(item);
+                const desc = item.getAttribute('data-desc') || '';
+                const descLower = desc.toLowerCase();
+                if (keywords.some(k => descLower.includes(k))) {{
+                    coincidentes.push({{indice, desc}});
+                }}
+            }});
+            const primero = items.length
+                ? {{indice: todos.indexOf(items[0]), desc: items[0].getAttribute('data-desc') || 'item'}}
+                : null;
+            const descs = items.map(item => item.getAttribute('data-desc'));
+            return {{total: items.length, coincidentes, primero, descs}};
+        }}""", [SELECTOR_ITEMS, keywords])
         
-        for item in items:
-            try:
-                # Obtener la descripción del item
-                desc = item.get_attribute("data-desc") or ""
-                desc_lower = desc.lower()
-                
-                # Verificar si coincide con algún keyword
-                for keyword in keywords:
-                    if keyword.lower() in desc_lower:
-                        # Obtener el label padre para hacer click ahí
-                        label = item.locator("xpath=ancestor::label")
-                        items_coincidentes.append({"label": label, "desc": desc})
-                        break
-            except:
-                continue
+        if not resultado["total"]:
+            log.warning(f"   ⚠️ No hay items en {categoria}")
+            return False
+        
+        log.info(f"   📋 Encontrados {resultado['total']} items en {categoria}")
+        vistos.extend(resultado["descs"])
         
         # Si encontró coincidencias, elegir una al azar
-        if items_coincidentes:
-            elegido = random.choice(items_coincidentes)
-            print(f"   ✓ Seleccionando: {elegido['desc'][:50]}...")
-            elegido["label"].click()
-            time.sleep(config["delay_entre_acciones"] / 1000)
-            print(f"   ✅ {descripcion.capitalize()} agregado/a")
-            return True
+        if resultado["coincidentes"]:
+            elegido = random.choice(resultado["coincidentes"])
+            sufijo = ""
         else:
             # Si no hay coincidencias, tomar el primero disponible
-            print(f"   ⚠️ No se encontró preferencia, tomando primera opción")
-            primer_item = items[0]
-            desc = primer_item.get_attribute("data-desc") or "item"
-            # Obtener el label padre
-            label = primer_item.locator("xpath=ancestor::label")
-            print(f"   ✓ Seleccionando: {desc[:50]}...")
-            label.click()
-            time.sleep(config["delay_entre_acciones"] / 1000)
-            print(f"   ✅ {descripcion.capitalize()} agregado/a (opción alternativa)")
-            return True
+            log.warning(f"   ⚠️ No se encontró preferencia, tomando primera opción")
+            elegido = resultado["primero"]
+            sufijo = " (opción alternativa)"
+        
+        # Necesitamos hacer click en el LABEL padre para que funcione el onclick
+        label = page.locator(SELECTOR_ITEMS).nth(elegido["indice"]).locator("xpath=ancestor::label")
+        log.info(f"   ✓ Seleccionando: {elegido['desc'][:50]}...")
+        await label.click()
+        log.info(f"   ✅ {descripcion.capitalize()} agregado/a{sufijo}")
+        return True
             
     except PlaywrightTimeout:
-        print(f"   ⚠️ Categoría {categoria} no encontrada")
+        log.warning(f"   ⚠️ Categoría {categoria} no encontrada")
         return False
     except Exception as e:
-        print(f"   ❌ Error: {e}")
+        log.error(f"   ❌ Error: {e}")
         return False
 
 
-def confirmar_pedido(page):
+async def confirmar_pedido(page, config, log=logger):
     """Confirma el pedido clickeando CONFIRMAR."""
-    print("   💾 Confirmando pedido...")
+    log.info("   💾 Confirmando pedido...")
     
     try:
         # El botón es un <a> con id="btnConfirmarPedido"
-        page.click('#btnConfirmarPedido', timeout=5000)
+        await page.click('#btnConfirmarPedido')
         
-        # Esperar a que se procese la confirmación
-        time.sleep(3)
-        page.wait_for_load_state("networkidle")
-        time.sleep(2)
+        # El pedido quedó registrado cuando la app saca el botón de la pantalla
+        await page.locator('#btnConfirmarPedido').wait_for(
+            state="hidden", timeout=config["timeout_navegacion"]
+        )
         
-        print("   ✅ Pedido confirmado")
+        log.info("   ✅ Pedido confirmado")
         return True
     except Exception as e:
-        print(f"   ⚠️ Error al confirmar: {e}")
+        log.warning(f"   ⚠️ Error al confirmar: {e}")
         return False
 
 
-def volver_al_calendario(page, config):
-    """Vuelve a la pantalla del calendario."""
-    try:
-        # El botón es un <a> con id="btnVolver"
-        page.click('#btnVolver', timeout=3000)
-    except:
-        try:
-            page.goto(config["url"])
-        except:
-            pass
-    
-    time.sleep(2)
-    page.wait_for_load_state("networkidle")
-
-
-def procesar_dia(page, config, dia_info, dry_run=False):
+async def procesar_dia(page, config, dia_info, log=logger):
     """Procesa el pedido para un día específico."""
-    numero = dia_info["numero"]
     dia_id = dia_info["id"]
     
-    print(f"\n{'='*50}")
-    print(f"📆 Procesando día {numero} ({dia_id})")
-    print(f"{'='*50}")
-    
-    if dry_run:
-        print("   [DRY RUN] Simulando...")
-        return True
-    
     try:
-        # Click en el día
-        dia_info["elemento"].click()
-        time.sleep(config["delay_entre_acciones"] / 1000)
+        # Click en el día (se busca por id: sirve en cualquier contexto)
+        await page.click(f"#{dia_id}")
         
         # Seleccionar ubicación si aparece el modal
-        seleccionar_ubicacion(page, config)
+        await seleccionar_ubicacion(page, config, log)
         
-        # Esperar a que cargue el menú
-        page.wait_for_load_state("networkidle")
-        time.sleep(2)
+        # Esperar a que cargue el menú (categorías o aviso de sin servicio).
+        # Sin menú no se puede pedir: el día cuenta como fallido.
+        try:
+            menu = await page.wait_for_selector(
+                f"div[data-dimension], {SELECTOR_SIN_SERVICIO}",
+                timeout=config["timeout_menu"]
+            )
+        except PlaywrightTimeout:
+            log.error("   ❌ El menú del día no cargó")
+            return False
         
-        # Verificar si hay servicio
-        if page.locator('text="DÍA SIN SERVICIO"').count() > 0:
-            print("   ⏭️ Día sin servicio, saltando...")
-            volver_al_calendario(page, config)
+        # Verificar si hay servicio: si lo que apareció no es una categoría,
+        # es el aviso de DÍA SIN SERVICIO (match exacto del :text-is)
+        if await menu.get_attribute("data-dimension") is None:
+            log.info("   ⏭️ Día sin servicio, saltando...")
             return True
         
-        # Seleccionar ensalada
-        seleccionar_item_de_categoria(
-            page, config,
-            "ENSALADAS",
-            config["ensaladas_keywords"],
-            "ensalada"
-        )
+        vistos = []
         
-        # Seleccionar postre
-        seleccionar_item_de_categoria(
-            page, config,
-            "POSTRES",
-            config["postres_preferidos"],
-            "postre"
-        )
-        
-        # Seleccionar bebida
-        seleccionar_item_de_categoria(
-            page, config,
-            "BEBIDAS",
-            config["bebidas_preferidas"],
-            "bebida"
+        # Seleccionar ensalada, postre y bebida; si falta alguno no se confirma
+        # un pedido incompleto
+        completo = (
+            await seleccionar_item_de_categoria(
+                page, config,
+                "ENSALADAS",
+                config["ensaladas_keywords"],
+                "ensalada",
+                vistos, log
+            )
+            and await seleccionar_item_de_categoria(
+                page, config,
+                "POSTRES",
+                config["postres_preferidos"],
+                "postre",
+                vistos, log
+            )
+            and await seleccionar_item_de_categoria(
+                page, config,
+                "BEBIDAS",
+                config["bebidas_preferidas"],
+                "bebida",
+                vistos, log
+            )
         )
+        if not completo:
+            log.error("   ❌ Pedido incompleto, no se confirma")
+            return False
         
         # Confirmar pedido
-        confirmar_pedido(page)
-        
-        # Volver al calendario para el siguiente día
-        volver_al_calendario(page, config)
-        
-        return True
+        return await confirmar_pedido(page, config, log)
         
     except Exception as e:
-        print(f"   ❌ Error procesando día {numero}: {e}")
-        # Intentar volver al calendario
+        log.error(f"   ❌ Error procesando el día: {e}")
+        return False
+
+
+async def bloquear_recursos(route, request):
+    """Aborta imágenes, fuentes y analytics que no hacen falta para pedir."""
+    if request.resource_type in RECURSOS_BLOQUEADOS:
+        return await route.abort()
+    if any(dominio in request.url for dominio in DOMINIOS_BLOQUEADOS):
+        return await route.abort()
+    return await route.continue_()
+
+
+async def crear_contexto(browser, config, storage_state=None):
+    """Crea un contexto de navegador con la configuración común del agente."""
+    context = await browser.new_context(
+        viewport={"width": 1280, "height": 800},
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+        storage_state=storage_state
+    )
+    await context.route("**/*", bloquear_recursos)
+    
+    # Navegación con margen amplio; los elementos que no aparecen fallan rápido
+    context.set_default_navigation_timeout(config["timeout_navegacion"])
+    context.set_default_timeout(config["timeout_elemento"])
+    return context
+
+
+async def volver_al_calendario(page, config):
+    """
+    Deja la página en el calendario sin recargar la app si se puede.
+    Si ya está en el calendario (por ej. después de confirmar) no hace nada.
+    """
+    if await page.locator(SELECTOR_DIAS).first.is_visible():
+        return
+    
+    try:
+        # El botón es un <a> con id="btnVolver"
+        await page.click('#btnVolver', timeout=2000)
+    except PlaywrightTimeout:
         try:
-            page.goto(config["url"])
-            time.sleep(2)
-        except:
+            await page.go_back()
+        except PlaywrightTimeout:
             pass
-        return False
+    
+    try:
+        await page.wait_for_selector(SELECTOR_DIAS, timeout=config["timeout_calendario"])
+    except PlaywrightTimeout:
+        # Último recurso: recargar la app completa
+        await page.goto(config["url"])
 
 
-def ejecutar_agente(visible=False, dry_run=False):
-    """Función principal del agente."""
-    config = get_config()
+async def trabajador(browser, config, archivo_sesion, cola):
+    """
+    Procesa días de la cola en un único contexto que comparte la sesión guardada.
+    La app se carga una sola vez; entre días se vuelve al calendario sin recargar.
+    Devuelve el resultado (True/False) de cada día que procesó.
+    """
+    resultados = []
+    context = None
+    try:
+        context = await crear_contexto(browser, config, archivo_sesion)
+        page = await context.new_page()
+        await page.goto(config["url"])
+        await page.wait_for_selector(SELECTOR_DIAS, timeout=config["timeout_calendario"])
+    except Exception as e:
+        # Los días quedan en la cola para los otros trabajadores
+        logger.error(f"   ❌ Error abriendo un contexto de trabajo: {e}")
+        if context:
+            await context.close()
+        return resultados
+    
+    try:
+        while True:
+            try:
+                dia_info = cola.get_nowait()
+            except asyncio.QueueEmpty:
+                return resultados
+            
+            log = LoggerDia(logger, {"numero": dia_info["numero"]})
+            log.info(f"📆 Procesando día ({dia_info['id']})")
+            try:
+                await volver_al_calendario(page, config)
+                
+                # Esperar a que el calendario muestre el día antes de hacer click
+                await page.wait_for_selector(f"#{dia_info['id']}", timeout=config["timeout_calendario"])
+                resultados.append(await procesar_dia(page, config, dia_info, log))
+            except Exception as e:
+                log.error(f"❌ Error abriendo el día: {e}")
+                resultados.append(False)
+    finally:
+        await context.close()
+
+
+async def ejecutar_agente(visible=False, dry_run=False, debug=False):
+    """
+    Función principal del agente.
+    Devuelve el código de salida; el navegador y Playwright ya están cerrados al volver.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    logger.setLevel(logging.DEBUG if debug else logging.INFO)
     
-    print("\n" + "="*60)
-    print("🤖 SOCIAL LUNCH - AGENTE DE PEDIDO AUTOMÁTICO")
-    print("="*60)
-    print(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
-    print(f"👤 Usuario: ***")
-    print(f"📍 Ubicación: {config['ubicacion']}")
+    try:
+        config = get_config()
+    except ConfigError as e:
+        logger.error("❌ Error: Variables de entorno no configuradas")
+        logger.error(f"   {e}")
+        return 1
+    
+    logger.info("\n" + "="*60)
+    logger.info("🤖 SOCIAL LUNCH - AGENTE DE PEDIDO AUTOMÁTICO")
+    logger.info("="*60)
+    logger.info(f"📅 Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
+    logger.info(f"👤 Usuario: ***")
+    logger.info(f"📍 Ubicación: {config['ubicacion']}")
     if dry_run:
-        print("⚠️  MODO DRY-RUN: No se harán pedidos reales")
-    print("="*60)
+        logger.info("⚠️  MODO DRY-RUN: No se harán pedidos reales")
+    logger.info("="*60)
     
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=not visible,
-            slow_mo=500 if visible else 0
-        )
-        
-        context = browser.new_context(
-            viewport={"width": 1280, "height": 800},
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-        )
-        
-        page = context.new_page()
-        page.set_default_timeout(config["timeout_elemento"])
+    async with async_playwright() as p:
+        try:
+            browser = await p.chromium.launch(
+                headless=not visible,
+                slow_mo=500 if visible else 0
+            )
+        except Exception as e:
+            logger.error(f"\n❌ No se pudo abrir el navegador: {e}")
+            return 1
         
         try:
-            # Login
-            if not login(page, config):
-                print("\n❌ Login fallido. Abortando.")
-                sys.exit(1)
+            archivo_sesion = config["archivo_sesion"]
+            hay_sesion = os.path.exists(archivo_sesion)
+            
+            context = None
+            if hay_sesion:
+                try:
+                    context = await crear_contexto(browser, config, archivo_sesion)
+                except Exception as e:
+                    # Archivo dañado: se ignora y se vuelve a iniciar sesión (se sobrescribe abajo)
+                    logger.warning(f"⚠️ Sesión guardada inválida, se ignora: {e}")
+                    hay_sesion = False
+            if context is None:
+                context = await crear_contexto(browser, config)
+            
+            page = await context.new_page()
+            if debug:
+                page.on("response", registrar_respuesta_json)
+            
+            # Login (solo si no hay una sesión guardada válida)
+            if not (hay_sesion and await sesion_activa(page, config)):
+                if not await login(page, config):
+                    logger.error("\n❌ Login fallido. Abortando.")
+                    return 1
+            
+            # Guardar siempre: el servidor puede haber renovado las cookies de la sesión
+            await context.storage_state(path=archivo_sesion)
             
             # Obtener días disponibles
-            dias = obtener_dias_disponibles(page)
+            dias = await obtener_dias_disponibles(page, config)
+            
+            if dias is None:
+                logger.error("\n❌ No se pudo leer el calendario. Abortando.")
+                return 1
             
             if not dias:
-                print("\n✅ No hay días pendientes de pedir (ya están todos con pedido o sin servicio)")
-                sys.exit(0)
+                logger.info("\n✅ No hay días pendientes de pedir (ya están todos con pedido o sin servicio)")
+                return 0
+            
+            logger.info(f"\n📋 Días a procesar: {[d['numero'] for d in dias]}")
             
-            print(f"\n📋 Días a procesar: {[d['numero'] for d in dias]}")
+            # El contexto del login ya no se usa: cada trabajador abre el suyo
+            await context.close()
             
-            # Procesar cada día
-            exitos = 0
-            errores = 0
+            if dry_run:
+                for dia in dias:
+                    log = LoggerDia(logger, {"numero": dia["numero"]})
+                    log.info(f"📆 Procesando día ({dia['id']})")
+                    log.info("[DRY RUN] Simulando...")
+                resultados = [True] * len(dias)
+            else:
+                # Procesar los días en paralelo: cada trabajador tiene su contexto
+                # y va tomando días de la cola
+                cola = asyncio.Queue()
+                for dia in dias:
+                    cola.put_nowait(dia)
+                
+                cantidad = min(config["dias_en_paralelo"], len(dias))
+                por_trabajador = await asyncio.gather(*[
+                    trabajador(browser, config, archivo_sesion, cola)
+                    for _ in range(cantidad)
+                ])
+                resultados = [r for lista in por_trabajador for r in lista]
             
-            for dia in dias:
-                if procesar_dia(page, config, dia, dry_run):
-                    exitos += 1
-                else:
-                    errores += 1
-                time.sleep(1)
+            # Los días que no llegó a tomar ningún trabajador cuentan como fallidos
+            exitos = sum(1 for r in resultados if r)
+            errores = len(dias) - exitos
             
             # Resumen
-            print("\n" + "="*60)
-            print("📊 RESUMEN")
-            print("="*60)
-            print(f"✅ Pedidos exitosos: {exitos}")
-            print(f"❌ Pedidos fallidos: {errores}")
-            print(f"📅 Total días procesados: {len(dias)}")
-            print("="*60)
+            logger.info("\n" + "="*60)
+            logger.info("📊 RESUMEN")
+            logger.info("="*60)
+            logger.info(f"✅ Pedidos exitosos: {exitos}")
+            logger.info(f"❌ Pedidos fallidos: {errores}")
+            logger.info(f"📅 Total días procesados: {len(dias)}")
+            logger.info("="*60)
             
-            if errores > 0:
-                sys.exit(1)
+            return 1 if errores > 0 else 0
                 
         except Exception as e:
-            print(f"\n❌ Error general: {e}")
-            sys.exit(1)
+            logger.error(f"\n❌ Error general: {e}")
+            return 1
         finally:
-            browser.close()
+            await browser.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Social Lunch Bot")
     parser.add_argument("--visible", action="store_true", help="Mostrar navegador")
     parser.add_argument("--dry-run", action="store_true", help="Simular sin ejecutar")
+    parser.add_argument("--debug", action="store_true", help="Mostrar detalle de cada día")
     
     args = parser.parse_args()
-    ejecutar_agente(visible=args.visible, dry_run=args.dry_run)
+    sys.exit(asyncio.run(ejecutar_agente(visible=args.visible, dry_run=args.dry_run, debug=args.debug)))